@@ -1,19 +1,65 @@
 import os
 import json
-from typing import Dict, List, Optional, Any
+from functools import cached_property, lru_cache
+from typing import Dict, List, Optional, Any, Union
 from pydantic_settings import BaseSettings
-from pydantic import field_validator
 
 
 def load_api_keys_from_file(filepath: str) -> Dict[str, Any]:
     """Load API keys from a JSON file if it exists."""
-    if os.path.exists(filepath):
-        try:
-            with open(filepath, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"⚠️ Error loading API keys from {filepath}: {e}")
-    return {}
+    try:
+        mtime = os.stat(filepath).st_mtime
+    except FileNotFoundError:
+        return {}
+    except OSError as e:
+        print(f"⚠️ Error loading API keys from {filepath}: {e}")
+        return {}
+    return _load_api_keys_cached(filepath, mtime)
+
+
+@lru_cache(maxsize=4)
+def _load_api_keys_cached(filepath: str, mtime: float) -> Dict[str, Any]:
+    # Keyed by mtime so an edited file is re-read, an unchanged one is not.
+    # The result is shared between callers and must not be mutated.
+    try:
+        with open(filepath, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"⚠️ Error loading API keys from {filepath}: {e}")
+        return {}
+
+
+def normalize_api_keys(v: Any) -> Dict[str, Dict[str, Any]]:
+    """
+    Normalize API keys to full user format.
+    Supports both simple format (key -> tier) and full format (key -> {user, tier, org}).
+    """
+    if not isinstance(v, dict):
+        return {}
+
+    normalized = {}
+    for key, value in v.items():
+        if isinstance(value, str):
+            # Simple format: "sk_key": "tier0" -> convert to full format
+            normalized[key] = {
+                "user": "anonymous",
+                "tier": value,
+                "org": None
+            }
+        elif isinstance(value, dict):
+            # Full format: ensure required fields exist
+            normalized[key] = {
+                "user": value.get("user", "anonymous"),
+                "tier": value.get("tier", "tier0"),
+                "org": value.get("org")
+            }
+        else:
+            # Skip invalid entries
+            continue
+
+    return normalized
 
 
 class Settings(BaseSettings):
@@ -28,6 +74,10 @@ class Settings(BaseSettings):
     API_CONFIG_PATH: str = "./api_config.yaml"
     DBT_MANIFEST_REFRESH_ENABLED: bool = True
     DBT_MANIFEST_REFRESH_INTERVAL_SECONDS: int = 300
+    # Back off up to this multiple of the interval while the manifest is unchanged
+    DBT_MANIFEST_REFRESH_MAX_BACKOFF: int = 10
+    # Persist the parsed manifest next to DBT_MANIFEST_PATH for warm restarts
+    DBT_MANIFEST_CACHE_ENABLED: bool = True
     
     # API Keys file path (JSON file with user keys)
     API_KEYS_FILE: str = "./api_keys.json"
@@ -44,45 +94,14 @@ class Settings(BaseSettings):
     CLICKHOUSE_DATABASE: str = "default"
     CLICKHOUSE_SECURE: bool = True
 
-    # Security: API Keys mapped to user info
+    # Security: API Keys mapped to user info (raw, see `api_keys` for the normalized view)
+    # Kept permissive: invalid values are dropped by normalize_api_keys, not rejected at startup
     # Can be set via env var OR loaded from API_KEYS_FILE
     # Format: {
     #   "sk_live_abc123": {"user": "alice", "tier": "tier0", "org": "Acme Inc"},
     #   "sk_live_xyz789": {"user": "bob", "tier": "tier2", "org": "Partner Co"},
     # }
-    API_KEYS: Dict[str, Any] = {}
-
-    @field_validator('API_KEYS', mode='before')
-    @classmethod
-    def normalize_api_keys(cls, v):
-        """
-        Normalize API keys to full user format.
-        Supports both simple format (key -> tier) and full format (key -> {user, tier, org}).
-        """
-        if not isinstance(v, dict):
-            return {}
-        
-        normalized = {}
-        for key, value in v.items():
-            if isinstance(value, str):
-                # Simple format: "sk_key": "tier0" -> convert to full format
-                normalized[key] = {
-                    "user": "anonymous",
-                    "tier": value,
-                    "org": None
-                }
-            elif isinstance(value, dict):
-                # Full format: ensure required fields exist
-                normalized[key] = {
-                    "user": value.get("user", "anonymous"),
-                    "tier": value.get("tier", "tier0"),
-                    "org": value.get("org")
-                }
-            else:
-                # Skip invalid entries
-                continue
-        
-        return normalized
+    API_KEYS: Union[Dict[str, Any], Any] = {}
 
     # Default tier for endpoints without a tier tag (for testing, set to tier0)
     DEFAULT_ENDPOINT_TIER: str = "tier0"
@@ -100,20 +119,25 @@ class Settings(BaseSettings):
         case_sensitive = True
         extra = "ignore"  # Allow extra env vars without raising errors
 
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        # Debug: show if API_KEYS came from env
-        if self.API_KEYS:
-            print(f"✅ Loaded {len(self.API_KEYS)} API keys from environment variable")
-        # Load API keys from file if env var is empty and file exists
-        elif self.API_KEYS_FILE:
-            file_keys = load_api_keys_from_file(self.API_KEYS_FILE)
-            if file_keys:
-                # Normalize the loaded keys
-                self.API_KEYS = self.normalize_api_keys(file_keys)
-                print(f"✅ Loaded {len(self.API_KEYS)} API keys from {self.API_KEYS_FILE}")
-            else:
-                print(f"⚠️ No API keys found. Create {self.API_KEYS_FILE} or set API_KEYS env var.")
+    @cached_property
+    def api_keys(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Normalized API keys, resolved on first access.
+        The API_KEYS env var takes precedence over API_KEYS_FILE.
+        """
+        keys = normalize_api_keys(self.API_KEYS)
+        if keys:
+            print(f"✅ Loaded {len(keys)} API keys from environment variable")
+            return keys
+
+        file_keys = load_api_keys_from_file(self.API_KEYS_FILE) if self.API_KEYS_FILE else {}
+        if file_keys:
+            keys = normalize_api_keys(file_keys)
+            print(f"✅ Loaded {len(keys)} API keys from {self.API_KEYS_FILE}")
+            return keys
+
+        print(f"⚠️ No API keys found. Create {self.API_KEYS_FILE} or set API_KEYS env var.")
+        return {}
 
 
 settings = Settings()
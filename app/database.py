@@ -1,9 +1,16 @@
+import asyncio
+import weakref
 import clickhouse_connect
+from clickhouse_connect import common
 from app.config import settings
-from typing import Any, List, Dict
+from typing import Any, List, Dict, Tuple
 
 class ClickHouseClient:
     _client = None
+    # Per event loop: (sql, params) -> task running that query in a worker thread
+    _inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, asyncio.Task]]" = (
+        weakref.WeakKeyDictionary()
+    )
 
     @classmethod
     def get_client(cls):
@@ -11,6 +18,9 @@ class ClickHouseClient:
         Returns a singleton ClickHouse client instance.
         """
         if cls._client is None:
+            # Queries run from worker threads concurrently; a shared session
+            # would make clickhouse-connect reject overlapping queries.
+            common.set_setting('autogenerate_session_id', False)
             cls._client = clickhouse_connect.get_client(
                 host=settings.CLICKHOUSE_URL,
                 port=settings.CLICKHOUSE_PORT,
@@ -34,4 +44,30 @@ class ClickHouseClient:
         except Exception as e:
             # In a real app, you might want to log this to Sentry/Datadog
             print(f"DB Error: {e}")
-            raise e
\ No newline at end of file
+            raise e
+
+    @classmethod
+    async def query_async(cls, query_str: str, parameters: Dict[str, Any] = None) -> List[Dict]:
+        """
+        Runs query() in a worker thread, coalescing identical concurrent calls:
+        requests for the same (query, parameters) that arrive while one is
+        already in flight await that query's result instead of issuing another.
+        The returned list is shared between those callers and must not be mutated.
+        """
+        loop = asyncio.get_running_loop()
+        inflight = cls._inflight.get(loop)
+        if inflight is None:
+            inflight = cls._inflight[loop] = {}
+
+        try:
+            key = (query_str, frozenset((parameters or {}).items()))
+            task = inflight.get(key)
+        except TypeError:
+            # Unhashable parameter values (lists/dicts for IN etc.): run uncoalesced
+            return await asyncio.to_thread(cls.query, query_str, parameters)
+        if task is None:
+            task = loop.create_task(asyncio.to_thread(cls.query, query_str, parameters))
+            inflight[key] = task
+            task.add_done_callback(lambda _: inflight.pop(key, None))
+        # Shield so one cancelled requester doesn't cancel the query for the rest
+        return await asyncio.shield(task)
@@ -1,10 +1,120 @@
-import json
 import os
+import sys
+import mmap
 import hashlib
-import requests
-from typing import Dict, Any, Optional, List, Tuple
+import httpx
+import orjson
+from typing import Dict, Any, Optional, List, Tuple, FrozenSet, NamedTuple
 from app.config import settings
 
+
+# Tags that never contribute to the category / Swagger section of a model
+_SYSTEM_TAGS = frozenset({
+    'production', 'view', 'table', 'incremental',
+    'staging', 'intermediate',
+    # Granularity values (in case used as standalone tags)
+    'daily', 'weekly', 'monthly', 'hourly',
+    'latest', 'in_ranges', 'last_30d', 'last_7d', 'all_time'
+})
+
+
+def _is_tier(tag_lower: str) -> bool:
+    """True for lower-cased tier tags ('tier0', 'tier1', ...)."""
+    return len(tag_lower) > 4 and tag_lower[:4] == "tier" and tag_lower[4:].isdecimal()
+
+
+# Bump when the on-disk cache layout changes
+_CACHE_VERSION = 1
+
+# Shared by the sync and async manifest clients so both fetch paths behave
+# the same: 30s per connect/read (not a cap on the whole download), up to 5
+# redirects, no retries (httpx's default).
+_HTTP_CLIENT_OPTIONS: Dict[str, Any] = {
+    "http2": True,
+    "timeout": httpx.Timeout(30.0),
+    "follow_redirects": True,
+    "max_redirects": 5,
+}
+
+# Read size when streaming the manifest download
+_DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+_API_PREFIX = "api:"
+_GRANULARITY_PREFIX = "granularity:"
+
+
+class TagInfo(NamedTuple):
+    api_resource: Optional[str]
+    granularity: Optional[str]
+    category: str
+    tier: Optional[str]
+    section: str
+
+
+def _classify(dbt_tags: List[str]) -> TagInfo:
+    """
+    Derive everything routing needs from a model's tags in a single pass.
+
+    - api_resource: value of the first non-empty 'api:xyz' tag
+    - granularity: value of the first non-empty 'granularity:xyz' tag (lower-cased)
+    - category: first non-system, non-tier, non-prefixed tag (lower-cased), else "general"
+    - tier: first 'tierN' tag (lower-cased), if any
+    - section: Swagger UI section derived from the category
+
+    Examples:
+        ["production", "consensus", "tier1", "api:blob", "granularity:daily"]
+        -> TagInfo("blob", "daily", "consensus", "tier1", "Consensus")
+        ["production", "api:test"]
+        -> TagInfo("test", None, "general", None, "General")
+    """
+    api_resource = None
+    granularity = None
+    category = None
+    tier = None
+
+    for tag in dbt_tags:
+        # Prefixed tags (api:, granularity:)
+        if ':' in tag:
+            if api_resource is None and tag.startswith(_API_PREFIX):
+                api_resource = tag[len(_API_PREFIX):].strip() or None
+            elif granularity is None and tag.startswith(_GRANULARITY_PREFIX):
+                granularity = tag[len(_GRANULARITY_PREFIX):].strip().lower() or None
+            continue
+
+        tag_lower = tag.lower()
+        # Tier tags (tier0, tier1, etc.)
+        if _is_tier(tag_lower):
+            if tier is None:
+                tier = tag_lower
+            continue
+        if category is None and tag_lower not in _SYSTEM_TAGS:
+            category = tag_lower
+
+    category = category or "general"
+    section = category.replace("_", " ").title()
+    return TagInfo(api_resource, granularity, category, tier, section)
+
+
+def _intern_node(node: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The same tag and column names repeat across thousands of nodes; intern
+    them so every node shares one string object. Mutates and returns node.
+    """
+    node["tags"] = [sys.intern(t) for t in node.get("tags", [])]
+    columns = node.get("columns")
+    if columns:
+        node["columns"] = {sys.intern(c): meta for c, meta in columns.items()}
+    return node
+
+
+class FetchResult(NamedTuple):
+    status: int
+    body: Optional[bytearray] = None
+    hash: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
 class ManifestLoader:
     _instance = None
 
@@ -12,57 +122,230 @@ class ManifestLoader:
         if cls._instance is None:
             cls._instance = super(ManifestLoader, cls).__new__(cls)
             cls._instance._models = {}
+            cls._instance._reset_indices()
             cls._instance._etag = None
             cls._instance._last_modified = None
             cls._instance._hash = None
             cls._instance._last_error = None
-            cls._instance._load_manifest(allow_fallback=True, conditional=False)
+            # Kept alive across polls so conditional GETs reuse the connection
+            cls._instance._http = httpx.Client(**_HTTP_CLIENT_OPTIONS)
+            # A warm cache lets startup revalidate with a conditional GET
+            cached = cls._instance._load_cache()
+            cls._instance._load_manifest(allow_fallback=True, conditional=cached)
         return cls._instance
 
-    def _hash_bytes(self, data: bytes) -> str:
-        return hashlib.sha256(data).hexdigest()
+    def _cache_path(self) -> str:
+        base, _ = os.path.splitext(settings.DBT_MANIFEST_PATH)
+        return f"{base}.cache.json"
+
+    def _load_cache(self) -> bool:
+        """
+        Restore the last parsed manifest from the on-disk cache.
+        Returns True if a usable cache was loaded.
+        """
+        if not settings.DBT_MANIFEST_CACHE_ENABLED:
+            return False
+        path = self._cache_path()
+        try:
+            with open(path, 'rb') as f:
+                payload = orjson.loads(f.read())
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable manifest cache {path}: {e}")
+            return False
+
+        if not isinstance(payload, dict) or payload.get("version") != _CACHE_VERSION:
+            print(f"⚠️ Ignoring stale manifest cache {path}")
+            return False
+
+        try:
+            models = {name: _intern_node(node) for name, node in payload["models"].items()}
+            cached_hash = payload["hash"]
+            etag = payload["etag"]
+            last_modified = payload["last_modified"]
+        except Exception as e:
+            print(f"⚠️ Ignoring malformed manifest cache {path}: {e}")
+            return False
+
+        self._models = models
+        self._build_indices(models)
+        self._hash = cached_hash
+        self._etag = etag
+        self._last_modified = last_modified
+        print(f"📦 Restored {len(self._models)} models from manifest cache {path}")
+        return True
+
+    def _save_cache(self) -> None:
+        if not settings.DBT_MANIFEST_CACHE_ENABLED:
+            return
+        path = self._cache_path()
+        payload = {
+            "version": _CACHE_VERSION,
+            "models": self._models,
+            "hash": self._hash,
+            "etag": self._etag,
+            "last_modified": self._last_modified,
+        }
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(payload))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"⚠️ Could not write manifest cache {path}: {e}")
+
+    def _reset_indices(self) -> None:
+        # Per-model lookup tables, rebuilt once per manifest load so route
+        # building does plain dict lookups instead of re-scanning node dicts.
+        self._tags: Dict[str, List[str]] = {}
+        self._tag_set: Dict[str, FrozenSet[str]] = {}
+        self._api_resource: Dict[str, str] = {}
+        self._granularity: Dict[str, str] = {}
+        self._category: Dict[str, str] = {}
+        self._tier: Dict[str, str] = {}
+        self._section: Dict[str, str] = {}
+        self._columns: Dict[str, Dict[str, str]] = {}
+        self._table_name: Dict[str, str] = {}
+        # Hash of everything a model's route is derived from
+        self._fingerprint: Dict[str, int] = {}
+        # Rendered lazily by get_column_doc
+        self._column_doc: Dict[str, str] = {}
+
+    def _build_indices(self, models: Dict[str, Any]) -> None:
+        self._reset_indices()
+        for name, node in models.items():
+            tags = node.get("tags", [])
+            self._tags[name] = tags
+            self._tag_set[name] = frozenset(tags)
+
+            info = _classify(tags)
+            if info.api_resource:
+                self._api_resource[name] = info.api_resource
+            if info.granularity:
+                self._granularity[name] = info.granularity
+            if info.tier:
+                self._tier[name] = info.tier
+            self._category[name] = info.category
+            self._section[name] = info.section
+
+            self._columns[name] = {
+                col_name: col_meta.get("data_type", "String")
+                for col_name, col_meta in node.get("columns", {}).items()
+            }
+            schema = node.get("schema", "default")
+            alias = node.get("alias", name)
+            self._table_name[name] = f"{schema}.{alias}"
+
+            self._fingerprint[name] = hash((
+                tuple(tags),
+                tuple(self._columns[name].items()),
+                self._table_name[name],
+                node.get("description", ""),
+            ))
+
+    def _conditional_headers(self, conditional: bool) -> Dict[str, str]:
+        headers = {}
+        if conditional:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+        return headers
+
+    @staticmethod
+    def create_async_client() -> httpx.AsyncClient:
+        """AsyncClient configured like the loader's own sync client."""
+        return httpx.AsyncClient(**_HTTP_CLIENT_OPTIONS)
+
+    @staticmethod
+    def _downloaded(response: httpx.Response, hasher: Any, buf: bytearray) -> FetchResult:
+        return FetchResult(
+            200,
+            buf,
+            hasher.hexdigest(),
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+
+    def _fetch_url(self, conditional: bool) -> FetchResult:
+        print(f"🌐 Fetching manifest from {settings.DBT_MANIFEST_URL}...")
+        headers = self._conditional_headers(conditional)
+        with self._http.stream("GET", settings.DBT_MANIFEST_URL, headers=headers) as response:
+            if response.status_code != 200:
+                # Drain the (empty/short) body so the connection goes back to the pool
+                response.read()
+                return FetchResult(response.status_code)
+            # Hash while downloading so the body is only walked once
+            hasher = hashlib.sha256()
+            buf = bytearray()
+            for chunk in response.iter_bytes(_DOWNLOAD_CHUNK_SIZE):
+                hasher.update(chunk)
+                buf.extend(chunk)
+            return self._downloaded(response, hasher, buf)
+
+    async def _fetch_url_async(self, client: httpx.AsyncClient, conditional: bool) -> FetchResult:
+        print(f"🌐 Fetching manifest from {settings.DBT_MANIFEST_URL}...")
+        headers = self._conditional_headers(conditional)
+        async with client.stream("GET", settings.DBT_MANIFEST_URL, headers=headers) as response:
+            if response.status_code != 200:
+                await response.aread()
+                return FetchResult(response.status_code)
+            hasher = hashlib.sha256()
+            buf = bytearray()
+            async for chunk in response.aiter_bytes(_DOWNLOAD_CHUNK_SIZE):
+                hasher.update(chunk)
+                buf.extend(chunk)
+            return self._downloaded(response, hasher, buf)
 
     def _load_manifest(self, allow_fallback: bool, conditional: bool) -> bool:
+        fetched = None
+        fetch_error = None
+        if settings.DBT_MANIFEST_URL:
+            try:
+                fetched = self._fetch_url(conditional)
+            except Exception as e:
+                fetch_error = f"❌ Error fetching manifest URL: {e}"
+                print(fetch_error)
+        return self._ingest(fetched, fetch_error, allow_fallback)
+
+    def _ingest(
+        self,
+        fetched: Optional[FetchResult],
+        fetch_error: Optional[str],
+        allow_fallback: bool,
+    ) -> bool:
+        """
+        Parse and index a fetched manifest (falling back to the local file if
+        allowed). CPU-bound; returns True if the loaded models changed.
+        """
         data = None
-        raw_bytes = None
-        errors = []
+        new_hash = None
+        errors = [fetch_error] if fetch_error else []
         new_etag = None
         new_last_modified = None
         source = None
         self._last_error = None
         
         # 1. Try URL first
-        if settings.DBT_MANIFEST_URL:
-            try:
-                print(f"🌐 Fetching manifest from {settings.DBT_MANIFEST_URL}...")
-                headers = {}
-                if conditional:
-                    if self._etag:
-                        headers["If-None-Match"] = self._etag
-                    if self._last_modified:
-                        headers["If-Modified-Since"] = self._last_modified
-                response = requests.get(settings.DBT_MANIFEST_URL, timeout=30, headers=headers)
-                if response.status_code == 304:
-                    print("🔄 Manifest not modified (304).")
-                    return False
-                if response.status_code == 200:
-                    raw_bytes = response.content
-                    try:
-                        data = response.json()
-                        source = "url"
-                        new_etag = response.headers.get("ETag")
-                        new_last_modified = response.headers.get("Last-Modified")
-                        print("✅ Manifest downloaded successfully.")
-                    except Exception as e:
-                        msg = f"❌ Error parsing manifest JSON from URL: {e}"
-                        errors.append(msg)
-                        print(msg)
-                else:
-                    msg = f"❌ Failed to download manifest: Status {response.status_code}"
+        if fetched is not None:
+            if fetched.status == 304:
+                print("🔄 Manifest not modified (304).")
+                return False
+            if fetched.status == 200:
+                try:
+                    data = orjson.loads(fetched.body)
+                    new_hash = fetched.hash
+                    source = "url"
+                    new_etag = fetched.etag
+                    new_last_modified = fetched.last_modified
+                    print("✅ Manifest downloaded successfully.")
+                except Exception as e:
+                    msg = f"❌ Error parsing manifest JSON from URL: {e}"
                     errors.append(msg)
                     print(msg)
-            except Exception as e:
-                msg = f"❌ Error fetching manifest URL: {e}"
+            else:
+                msg = f"❌ Failed to download manifest: Status {fetched.status}"
                 errors.append(msg)
                 print(msg)
 
@@ -70,9 +353,11 @@ class ManifestLoader:
         if not data and allow_fallback and os.path.exists(settings.DBT_MANIFEST_PATH):
             try:
                 print(f"📂 Loading manifest from local file: {settings.DBT_MANIFEST_PATH}")
-                with open(settings.DBT_MANIFEST_PATH, 'rb') as f:
-                    raw_bytes = f.read()
-                data = json.loads(raw_bytes.decode("utf-8"))
+                with open(settings.DBT_MANIFEST_PATH, 'rb') as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                        memoryview(mm) as view:
+                    data = orjson.loads(view)
+                    new_hash = hashlib.sha256(view).hexdigest()
                 source = "file"
             except Exception as e:
                 msg = f"❌ Error loading local manifest: {e}"
@@ -87,12 +372,6 @@ class ManifestLoader:
                 self._last_error = "No manifest loaded."
             return False
 
-        new_hash = None
-        if raw_bytes is not None:
-            new_hash = self._hash_bytes(raw_bytes)
-        else:
-            new_hash = self._hash_bytes(json.dumps(data, sort_keys=True).encode("utf-8"))
-
         if self._hash and new_hash == self._hash:
             if source == "file":
                 self._etag = None
@@ -110,9 +389,10 @@ class ManifestLoader:
         for key, node in data.get("nodes", {}).items():
             if node.get("resource_type") == "model":
                 name = node.get("name")
-                new_models[name] = node
+                new_models[name] = _intern_node(node)
 
         self._models = new_models
+        self._build_indices(new_models)
         self._hash = new_hash
 
         if source == "file":
@@ -124,21 +404,51 @@ class ManifestLoader:
             self._last_modified = new_last_modified
 
         self._last_error = None
+        self._save_cache()
         
         print(f"✅ Loaded {len(self._models)} models from dbt manifest.")
         return True
 
+    def _reload_result(self, changed: bool) -> Tuple[bool, Optional[str]]:
+        if changed:
+            return True, None
+        if self._last_error:
+            return False, self._last_error
+        return False, None
+
     def reload_if_changed(self) -> Tuple[bool, Optional[str]]:
         """
         Reload manifest only if the remote source has changed.
         Returns (changed, error_message).
         """
         changed = self._load_manifest(allow_fallback=False, conditional=True)
-        if changed:
-            return True, None
-        if self._last_error:
-            return False, self._last_error
-        return False, None
+        return self._reload_result(changed)
+
+    async def fetch_if_changed_async(
+        self, client: httpx.AsyncClient
+    ) -> Tuple[Optional[FetchResult], Optional[str]]:
+        """
+        Conditionally fetch the remote manifest without blocking the event loop.
+        Returns (fetched, fetch_error) to be handed to reload_from_fetch.
+        """
+        if not settings.DBT_MANIFEST_URL:
+            return None, None
+        try:
+            return await self._fetch_url_async(client, conditional=True), None
+        except Exception as e:
+            fetch_error = f"❌ Error fetching manifest URL: {e}"
+            print(fetch_error)
+            return None, fetch_error
+
+    def reload_from_fetch(
+        self, fetched: Optional[FetchResult], fetch_error: Optional[str]
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Ingest the result of fetch_if_changed_async.
+        Returns (changed, error_message), like reload_if_changed.
+        """
+        changed = self._ingest(fetched, fetch_error, allow_fallback=False)
+        return self._reload_result(changed)
 
     def get_all_models(self) -> List[str]:
         """Return a list of all model names."""
@@ -148,29 +458,64 @@ class ManifestLoader:
         return self._models.get(model_name)
 
     def get_table_name(self, model_name: str) -> str:
-        node = self.get_model(model_name)
-        if node:
-            schema = node.get("schema", "default")
-            alias = node.get("alias", model_name)
-            return f"{schema}.{alias}"
-        return model_name
+        return self._table_name.get(model_name, model_name)
 
     def get_columns(self, model_name: str) -> Dict[str, str]:
         """Returns a dict of column_name -> data_type"""
-        node = self.get_model(model_name)
-        if not node:
-            return {}
-        
-        cols = {}
-        for col_name, col_meta in node.get("columns", {}).items():
-            cols[col_name] = col_meta.get("data_type", "String")
-        return cols
+        return self._columns.get(model_name, {})
+
+    def model_fingerprint(self, model_name: str) -> Optional[int]:
+        """
+        Hash of the manifest data a model's route is built from (tags, columns,
+        table name, description). Stable across reloads while the model is unchanged.
+        """
+        return self._fingerprint.get(model_name)
+
+    def get_column_doc(self, model_name: str) -> str:
+        """Markdown bullet list of the model's columns, cached until the next reload."""
+        doc = self._column_doc.get(model_name)
+        if doc is None:
+            columns = self.get_columns(model_name)
+            doc = "\n".join([f"- **{k}**: {v}" for k, v in columns.items()])
+            self._column_doc[model_name] = doc
+        return doc
 
     def get_tags(self, model_name: str) -> List[str]:
-        node = self.get_model(model_name)
-        if not node:
-            return []
-        return node.get("tags", [])
+        return self._tags.get(model_name, [])
+
+    def tag_set(self, model_name: str) -> FrozenSet[str]:
+        """Tag set (original case) for fast membership tests."""
+        return self._tag_set.get(model_name, frozenset())
+
+    def api_resource(self, model_name: str) -> Optional[str]:
+        """Resource name from the model's 'api:' tag, if any."""
+        return self._api_resource.get(model_name)
+
+    def granularity(self, model_name: str) -> Optional[str]:
+        """Granularity from the model's 'granularity:' tag, if any."""
+        return self._granularity.get(model_name)
+
+    def category(self, model_name: str) -> str:
+        """Primary category (first non-system, non-prefixed tag)."""
+        return self._category.get(model_name, "general")
+
+    def tier(self, model_name: str) -> Optional[str]:
+        """Tier tag ('tier0', 'tier1', ...) of the model, if any."""
+        return self._tier.get(model_name)
+
+    def section(self, model_name: str) -> str:
+        """Swagger UI section derived from the model's category."""
+        return self._section.get(model_name, "General")
+
+    def tag_info(self, model_name: str) -> TagInfo:
+        """All tag-derived routing metadata of a model at once."""
+        return TagInfo(
+            self.api_resource(model_name),
+            self.granularity(model_name),
+            self.category(model_name),
+            self.tier(model_name),
+            self.section(model_name),
+        )
 
     def model_count(self) -> int:
         return len(self._models)
@@ -1,10 +1,11 @@
 import asyncio
 import threading
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+import httpx
 from fastapi import FastAPI
 
 from app.config import settings
-from app.factory import build_router
+from app.factory import DynamicRouter
 from app.manifest import manifest
 
 
@@ -13,41 +14,147 @@ class RouterManager:
         self.app = app
         self._lock = threading.Lock()
         self._dynamic_routes: List[Any] = []
+        self._routes_fp: Optional[int] = None
         self._refresh_task: Optional[asyncio.Task] = None
+        # model_name -> (model fingerprint, routes registered on the app)
+        self._route_index: Dict[str, Tuple[Any, List[Any]]] = {}
+        # Reused across refreshes so polls ride one keep-alive connection
+        self._http: Optional[httpx.AsyncClient] = None
+        # Consecutive refreshes that found no change; drives poll back-off
+        self._unchanged_streak = 0
 
     def install_initial_routes(self) -> None:
-        router = build_router()
         with self._lock:
-            self._swap_routes(router)
+            self._sync_routes()
 
-    def _swap_routes(self, router) -> None:
-        # Capture current routes to isolate newly-added ones
-        before_ids = {id(r) for r in self.app.router.routes}
-        self.app.include_router(router, prefix="/v1")
-        added = [r for r in self.app.router.routes if id(r) not in before_ids]
+    @staticmethod
+    def _endpoint_fingerprint(model_name: str, override: dict) -> Any:
+        return (manifest.model_fingerprint(model_name), repr(override))
 
-        if self._dynamic_routes:
+    def _sync_routes(self) -> None:
+        """
+        Bring the app's dynamic routes in line with the current manifest,
+        rebuilding only the endpoints whose model or override changed.
+        Caller must hold self._lock.
+        """
+        builder = DynamicRouter()
+        endpoints = builder.get_endpoints()
+
+        new_index: Dict[str, Tuple[Any, List[Any]]] = {}
+        to_build: Dict[str, dict] = {}
+        fingerprints: Dict[str, Any] = {}
+        stale_ids = set()
+
+        for model_name, override in endpoints.items():
+            fp = self._endpoint_fingerprint(model_name, override)
+            entry = self._route_index.get(model_name)
+            if entry is not None and entry[0] == fp:
+                new_index[model_name] = entry
+                continue
+            if entry is not None:
+                stale_ids.update(id(r) for r in entry[1])
+            to_build[model_name] = override
+            fingerprints[model_name] = fp
+
+        for model_name, (_, routes) in self._route_index.items():
+            if model_name not in endpoints:
+                stale_ids.update(id(r) for r in routes)
+
+        if to_build:
+            builder.add_routes(to_build)
+            # Capture current routes to isolate newly-added ones
+            before_ids = {id(r) for r in self.app.router.routes}
+            self.app.include_router(builder.router, prefix="/v1")
+            added: Dict[str, List[Any]] = {}
+            for r in self.app.router.routes:
+                if id(r) not in before_ids:
+                    # Routes are registered with name=model_name
+                    added.setdefault(r.name, []).append(r)
+            for model_name, fp in fingerprints.items():
+                new_index[model_name] = (fp, added.get(model_name, []))
+
+        if stale_ids:
+            # Identity set: O(1) membership without invoking route __eq__
             self.app.router.routes = [
-                r for r in self.app.router.routes if r not in self._dynamic_routes
+                r for r in self.app.router.routes if id(r) not in stale_ids
             ]
 
-        self._dynamic_routes = added
-        self.app.openapi_schema = None
+        print(
+            f"🔁 Routes synced: {len(to_build)} built, "
+            f"{len(endpoints) - len(to_build)} unchanged, {len(stale_ids)} removed"
+        )
+
+        self._route_index = new_index
+        self._dynamic_routes = [r for _, routes in new_index.values() for r in routes]
+
+        # Only force OpenAPI regeneration if the documented surface changed
+        routes_fp = self._fingerprint_routes(self._dynamic_routes)
+        if routes_fp != self._routes_fp:
+            self.app.openapi_schema = None
+            self._routes_fp = routes_fp
+
+    @staticmethod
+    def _fingerprint_routes(routes: List[Any]) -> int:
+        """Hash of everything about the routes that ends up in the OpenAPI schema."""
+        return hash(tuple(sorted(
+            (
+                getattr(r, "path", ""),
+                tuple(sorted(getattr(r, "methods", None) or ())),
+                getattr(r, "name", ""),
+                tuple(getattr(r, "tags", None) or ()),
+                getattr(r, "summary", None) or "",
+                getattr(r, "description", None) or "",
+            )
+            for r in routes
+        )))
+
+    def _apply_reload(self, changed: bool, error: Optional[str]) -> Dict[str, Any]:
+        # Caller must hold self._lock
+        if error:
+            return {"status": "error", "models": manifest.model_count(), "detail": error}
+        if not changed:
+            return {"status": "unchanged", "models": manifest.model_count()}
+
+        self._sync_routes()
+        return {"status": "reloaded", "models": manifest.model_count()}
 
     def refresh_sync(self) -> Dict[str, Any]:
         with self._lock:
             changed, error = manifest.reload_if_changed()
-            if error:
-                return {"status": "error", "models": manifest.model_count(), "detail": error}
-            if not changed:
-                return {"status": "unchanged", "models": manifest.model_count()}
+            return self._apply_reload(changed, error)
 
-            router = build_router()
-            self._swap_routes(router)
-            return {"status": "reloaded", "models": manifest.model_count()}
+    def _get_http_client(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            self._http = manifest.create_async_client()
+        return self._http
 
     async def refresh_async(self) -> Dict[str, Any]:
-        return await asyncio.to_thread(self.refresh_sync)
+        # The conditional GET runs on the event loop; only parsing and
+        # route building (CPU-bound) are pushed to a worker thread.
+        fetched, fetch_error = await manifest.fetch_if_changed_async(self._get_http_client())
+
+        def _ingest_and_swap() -> Dict[str, Any]:
+            with self._lock:
+                changed, error = manifest.reload_from_fetch(fetched, fetch_error)
+                return self._apply_reload(changed, error)
+
+        result = await asyncio.to_thread(_ingest_and_swap)
+        if result["status"] == "unchanged":
+            self._unchanged_streak += 1
+        elif result["status"] == "reloaded":
+            self._unchanged_streak = 0
+        return result
+
+    def _next_refresh_interval(self) -> int:
+        """
+        Base interval, doubled per consecutive unchanged refresh and capped at
+        DBT_MANIFEST_REFRESH_MAX_BACKOFF times the base. A reload resets it.
+        """
+        base = settings.DBT_MANIFEST_REFRESH_INTERVAL_SECONDS
+        max_backoff = max(1, settings.DBT_MANIFEST_REFRESH_MAX_BACKOFF)
+        # Cap the shift so the multiplier never grows unbounded
+        multiplier = 1 << min(self._unchanged_streak, max_backoff.bit_length())
+        return base * min(max_backoff, multiplier)
 
     def start_background_refresh(self) -> None:
         if not settings.DBT_MANIFEST_REFRESH_ENABLED:
@@ -58,7 +165,7 @@ class RouterManager:
         async def _loop():
             try:
                 while True:
-                    await asyncio.sleep(settings.DBT_MANIFEST_REFRESH_INTERVAL_SECONDS)
+                    await asyncio.sleep(self._next_refresh_interval())
                     await self.refresh_async()
             except asyncio.CancelledError:
                 return
@@ -66,11 +173,13 @@ class RouterManager:
         self._refresh_task = asyncio.create_task(_loop())
 
     async def stop_background_refresh(self) -> None:
-        if not self._refresh_task:
-            return
-        self._refresh_task.cancel()
-        try:
-            await self._refresh_task
-        except asyncio.CancelledError:
-            pass
-        self._refresh_task = None
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
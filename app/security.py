@@ -86,8 +86,8 @@ async def get_api_key(api_key_header: str = Security(api_key_header)) -> Dict[st
             detail="Missing authentication header: X-API-Key"
         )
 
-    if api_key_header in settings.API_KEYS:
-        user_info = settings.API_KEYS[api_key_header].copy()
+    if api_key_header in settings.api_keys:
+        user_info = settings.api_keys[api_key_header].copy()
         user_info["api_key"] = api_key_header  # Include key reference for logging
         return user_info
 